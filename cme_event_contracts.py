@@ -9,16 +9,16 @@ import sys
 import re
 import json
 import gc
-import subprocess
+import functools
 import requests
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from pathlib import Path
+from requests.adapters import HTTPAdapter
 
-# Google Sheets API
-import google.auth
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+# PyMuPDF and the Google client libraries are imported lazily inside the
+# functions that need them: fitz only ever runs in the parse worker
+# processes, and googleapiclient is a large import that an early failure
+# path never touches.
 
 # Configuration
 CME_BASE_URL = "https://www.cmegroup.com"
@@ -36,7 +36,27 @@ HEADERS = {
     'sec-fetch-site': 'same-origin',
 }
 
+# Shared HTTPS session: keep-alive plus a small connection pool so both
+# PDF downloads reuse one TLS handshake to cmegroup.com
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+# Precompiled patterns for the PDF summary-line scans
+TOTAL_RE = re.compile(r'^\s*TOTAL\s+([\d,]+)', re.MULTILINE)
+TOTALS_RE = re.compile(r'^\s*Totals\s+([\d,]+)(?!.*by Products)', re.MULTILINE)
+
+# Report date header, e.g. "Wed, Aug 27, 2025"
+DATE_RE = re.compile(r'(Mon|Tue|Wed|Thu|Fri),\s+(\w+)\s+(\d+),\s+(\d{4})')
+MONTH_MAP = {'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04',
+             'May': '05', 'Jun': '06', 'Jul': '07', 'Aug': '08',
+             'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'}
+
+# Deletion table for thousands separators; translate() beats replace()
+# for this strip-only case
+_COMMA_TBL = str.maketrans('', '', ',')
+
 # Google configuration
+SHEETS_API = 'https://sheets.googleapis.com/v4/spreadsheets'
 TOKENS_FILE = os.path.expanduser("~/.google_tokens.json")
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
@@ -45,62 +65,37 @@ SCOPES = [
 NOTIFY_EMAIL = os.environ.get('NOTIFY_EMAIL', 'tn@lynott.co')
 
 
-def download_pdf(url: str, output_path: str) -> bool:
-    """Download PDF from URL."""
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=60)
-        response.raise_for_status()
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
-        print(f"Downloaded: {output_path} ({len(response.content)} bytes)")
-        return True
-    except Exception as e:
-        print(f"Error downloading {url}: {e}")
-        return False
-
-
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from PDF using pdftotext command line tool.
+def download_pdf(url: str) -> bytes:
+    """Download a PDF and return its bytes; empty bytes on failure.
 
-    Uses poppler-utils pdftotext which is very memory-efficient.
+    The bulletins are small enough to hold in memory, and the parsers
+    take byte streams directly, so there is no disk round-trip.
     """
     try:
-        result = subprocess.run(
-            ['pdftotext', '-layout', pdf_path, '-'],
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
-        if result.returncode == 0:
-            return result.stdout
-        else:
-            print(f"pdftotext error: {result.stderr}")
-            return ""
-    except FileNotFoundError:
-        print("pdftotext not found - install poppler-utils")
-        return ""
+        response = SESSION.get(url, headers=HEADERS, timeout=60)
+        response.raise_for_status()
+        print(f"Downloaded: {url} ({len(response.content)} bytes)")
+        return response.content
     except Exception as e:
-        print(f"Error extracting text: {e}")
-        return ""
+        print(f"Error downloading {url}: {e}")
+        return b""
 
 
-def extract_section73_volume(pdf_path: str) -> int:
-    """Extract total volume from Section 73 Event Contracts PDF."""
+def extract_section73_volume(pdf) -> int:
+    """Extract total volume from an already-opened Section 73 Event Contracts PDF."""
     total_volume = 0
     try:
-        text = extract_text_from_pdf(pdf_path)
-        if not text:
-            return 0
-
-        for line in text.split('\n'):
-            if line.strip().startswith('TOTAL'):
-                parts = line.split()
-                if len(parts) >= 2:
-                    try:
-                        vol = int(parts[1].replace(',', ''))
-                        total_volume += vol
-                    except ValueError:
-                        pass
+        for page in pdf:
+            text = page.get_text('text')
+            # Cheap substring check before the per-line scan; most pages
+            # carry no summary line at all
+            if 'TOTAL' not in text:
+                continue
+
+            total_volume += sum(
+                int(m.group(1).translate(_COMMA_TBL))
+                for m in TOTAL_RE.finditer(text)
+            )
 
         print(f"Section 73 total volume: {total_volume:,}")
         return total_volume
@@ -109,29 +104,48 @@ def extract_section73_volume(pdf_path: str) -> int:
         return 0
 
 
-def extract_swaps_volume(pdf_path: str) -> int:
-    """Extract total volume from Event Contracts Swaps PDF.
+def parse_section73_pdf(data: bytes) -> tuple:
+    """Parse the Section 73 PDF bytes in one open: (total volume, first-page text).
+
+    Top-level so it can run in a ProcessPoolExecutor worker; the
+    first-page text feeds the report-date regex in run_scraper.
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(stream=data, filetype='pdf') as pdf:
+        first_page_text = pdf[0].get_text('text') if pdf.page_count else ""
+        return extract_section73_volume(pdf), first_page_text
+
+
+def extract_swaps_volume(data: bytes) -> int:
+    """Extract total volume from Event Contracts Swaps PDF bytes.
 
     The PDF has CALLS and PUTS sections, each with a 'Totals X Y' summary line.
     """
+    import fitz  # PyMuPDF
+
     total_volume = 0
+    subtotals_found = 0
 
     try:
-        text = extract_text_from_pdf(pdf_path)
-        if not text:
-            return 0
-
-        for line in text.split('\n'):
-            # Look for summary "Totals" lines (e.g., "Totals 735,540 1,829,470")
-            if line.strip().startswith('Totals') and 'by Products' not in line:
-                parts = line.split()
-                if len(parts) >= 2:
-                    try:
-                        vol = int(parts[1].replace(',', ''))
-                        total_volume += vol
-                        print(f"  Found subtotal: {vol:,}")
-                    except (ValueError, IndexError):
-                        pass
+        with fitz.open(stream=data, filetype='pdf') as pdf:
+            for page in pdf:
+                text = page.get_text('text')
+                if 'Totals' not in text:
+                    continue
+
+                # Summary "Totals" lines (e.g., "Totals 735,540 1,829,470"),
+                # excluding the "Totals by Products" breakdown
+                for m in TOTALS_RE.finditer(text):
+                    vol = int(m.group(1).translate(_COMMA_TBL))
+                    total_volume += vol
+                    subtotals_found += 1
+                    print(f"  Found subtotal: {vol:,}")
+
+                # One summary line each for CALLS and PUTS; stop parsing
+                # once both are in hand
+                if subtotals_found >= 2:
+                    break
 
         print(f"Swaps total volume: {total_volume:,}")
         return total_volume
@@ -184,62 +198,81 @@ def get_google_credentials():
     return creds
 
 
-def write_to_google_sheet(spreadsheet_id: str, section73_volume: int, swaps_volume: int, date_str: str):
-    """Write volume data to Google Sheet."""
-    try:
-        creds = get_google_credentials()
-        service = build('sheets', 'v4', credentials=creds)
-        sheet = service.spreadsheets()
+@functools.lru_cache(maxsize=None)
+def get_google_service(api: str, version: str):
+    """Build a Google API client, cached per (api, version).
 
-        # Check if header exists, if not add it
-        result = sheet.values().get(
-            spreadsheetId=spreadsheet_id,
-            range='A1:C1'
-        ).execute()
+    Only Gmail still goes through googleapiclient (Sheets talks REST
+    directly); static_discovery skips fetching the discovery document
+    and the cache reuses one client per process.
+    """
+    from googleapiclient.discovery import build
 
-        existing_values = result.get('values', [])
-        if not existing_values or existing_values[0] != ['Date', 'Event Contracts (PG 73)', 'Event Contracts (Swaps)']:
-            # Add header
-            sheet.values().update(
-                spreadsheetId=spreadsheet_id,
-                range='A1:C1',
-                valueInputOption='RAW',
-                body={'values': [['Date', 'Event Contracts (PG 73)', 'Event Contracts (Swaps)']]}
-            ).execute()
-            print("Added header row")
-
-        # Get all existing dates to check for duplicates
-        result = sheet.values().get(
-            spreadsheetId=spreadsheet_id,
-            range='A:A'
-        ).execute()
-        existing_dates = [row[0] if row else '' for row in result.get('values', [])]
+    creds = get_google_credentials()
+    return build(api, version, credentials=creds,
+                 cache_discovery=False, static_discovery=True)
+
+
+def write_to_google_sheet(spreadsheet_id: str, section73_volume: int, swaps_volume: int, date_str: str):
+    """Write volume data to Google Sheet.
+
+    Talks to the Sheets REST API directly over the pooled SESSION, so
+    both calls reuse the same keep-alive connection instead of going
+    through googleapiclient's unpooled httplib2 transport.
+    """
+    from google.auth.transport.requests import Request
 
-        if date_str in existing_dates:
+    try:
+        creds = get_google_credentials()
+        if not creds.valid:
+            creds.refresh(Request())
+        auth_headers = {'Authorization': f'Bearer {creds.token}'}
+
+        # Fetch the header row and the full date column in one round-trip
+        response = SESSION.get(
+            f'{SHEETS_API}/{spreadsheet_id}/values:batchGet',
+            headers=auth_headers,
+            params={'ranges': ['A1:C1', 'A:A']},
+            timeout=30,
+        )
+        response.raise_for_status()
+        value_ranges = response.json().get('valueRanges', [])
+        header_rows = value_ranges[0].get('values', []) if value_ranges else []
+        date_rows = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
+
+        header = ['Date', 'Event Contracts (PG 73)', 'Event Contracts (Swaps)']
+        data = []
+        if not header_rows or header_rows[0] != header:
+            data.append({'range': 'A1:C1', 'values': [header]})
+            print("Adding header row")
+
+        date_to_row = {row[0]: i + 1 for i, row in enumerate(date_rows) if row}
+        row_idx = date_to_row.get(date_str)
+        if row_idx:
             # Update existing row
-            row_idx = existing_dates.index(date_str) + 1
-            sheet.values().update(
-                spreadsheetId=spreadsheet_id,
-                range=f'A{row_idx}:C{row_idx}',
-                valueInputOption='RAW',
-                body={'values': [[date_str, section73_volume, swaps_volume]]}
-            ).execute()
-            print(f"Updated existing row {row_idx} for {date_str}")
+            print(f"Updating existing row {row_idx} for {date_str}")
         else:
-            # Append new row
-            sheet.values().append(
-                spreadsheetId=spreadsheet_id,
-                range='A:C',
-                valueInputOption='RAW',
-                insertDataOption='INSERT_ROWS',
-                body={'values': [[date_str, section73_volume, swaps_volume]]}
-            ).execute()
-            print(f"Appended new row for {date_str}")
+            # Append under the last populated row (row 1 is the header)
+            row_idx = max(len(date_rows), 1) + 1
+            print(f"Appending new row {row_idx} for {date_str}")
+        data.append({
+            'range': f'A{row_idx}:C{row_idx}',
+            'values': [[date_str, section73_volume, swaps_volume]]
+        })
+
+        # Single write covers the header (when missing) and the data row
+        response = SESSION.post(
+            f'{SHEETS_API}/{spreadsheet_id}/values:batchUpdate',
+            headers=auth_headers,
+            json={'valueInputOption': 'RAW', 'data': data},
+            timeout=30,
+        )
+        response.raise_for_status()
 
         print(f"Successfully wrote to Google Sheet: {date_str}, {section73_volume:,}, {swaps_volume:,}")
         return True
 
-    except HttpError as e:
+    except requests.HTTPError as e:
         print(f"Google Sheets API error: {e}")
         return False
     except Exception as e:
@@ -253,8 +286,7 @@ def send_failure_notification(error_message: str):
     from email.mime.text import MIMEText
 
     try:
-        creds = get_google_credentials()
-        service = build('gmail', 'v1', credentials=creds)
+        service = get_google_service('gmail', 'v1')
 
         subject = f"CME Scraper FAILED — {datetime.now().strftime('%Y-%m-%d')}"
         body = (
@@ -291,24 +323,34 @@ def run_scraper():
     if not spreadsheet_id:
         raise ValueError("No spreadsheet ID provided. Set CME_SPREADSHEET_ID environment variable")
 
-    # Create temp directory for PDFs
-    tmp_dir = Path('/tmp/cme_pdfs')
-    tmp_dir.mkdir(exist_ok=True)
+    # Pipeline each PDF: the downloads overlap each other on the thread
+    # pool, and each parse starts in a worker process as soon as its own
+    # bytes arrive, without waiting for the other PDF
+    print("Downloading and parsing CME Event Contracts PDFs...")
+    with ThreadPoolExecutor(max_workers=2) as threads, \
+            ProcessPoolExecutor(max_workers=2) as pool:
+
+        def fetch_and_parse(url, parse):
+            data = download_pdf(url)
+            if not data:
+                return None
+            return pool.submit(parse, data).result()
+
+        section73_future = threads.submit(
+            fetch_and_parse, SECTION73_URL, parse_section73_pdf)
+        swaps_future = threads.submit(
+            fetch_and_parse, SWAPS_URL, extract_swaps_volume)
 
-    section73_path = tmp_dir / 'section73.pdf'
-    swaps_path = tmp_dir / 'swaps.pdf'
+        section73_result = section73_future.result()
+        swaps_result = swaps_future.result()
 
-    # Download PDFs
-    print("Downloading CME Event Contracts PDFs...")
-    if not download_pdf(SECTION73_URL, str(section73_path)):
+    if section73_result is None:
         raise RuntimeError("Failed to download Section 73 PDF")
-    if not download_pdf(SWAPS_URL, str(swaps_path)):
+    if swaps_result is None:
         raise RuntimeError("Failed to download Swaps PDF")
 
-    # Extract volumes
-    print("\nExtracting volume data...")
-    section73_volume = extract_section73_volume(str(section73_path))
-    swaps_volume = extract_swaps_volume(str(swaps_path))
+    section73_volume, first_page_text = section73_result
+    swaps_volume = swaps_result
 
     # Zero-volume guard: if both are 0, something went wrong with extraction
     if section73_volume == 0 and swaps_volume == 0:
@@ -319,13 +361,9 @@ def run_scraper():
 
     # Extract date from Section 73 PDF
     report_date = None
-    text = extract_text_from_pdf(str(section73_path))
-    match = re.search(r'(Mon|Tue|Wed|Thu|Fri),\s+(\w+)\s+(\d+),\s+(\d{4})', text)
+    match = DATE_RE.search(first_page_text)
     if match:
-        month_map = {'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04',
-                    'May': '05', 'Jun': '06', 'Jul': '07', 'Aug': '08',
-                    'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'}
-        month = month_map.get(match.group(2), '01')
+        month = MONTH_MAP.get(match.group(2), '01')
         day = match.group(3).zfill(2)
         year = match.group(4)
         report_date = f"{year}-{month}-{day}"